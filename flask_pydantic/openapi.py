@@ -1,8 +1,14 @@
-import re
+import copy
 import inspect
-from functools import wraps
+import json
+from functools import lru_cache, wraps
 from typing import Callable, List, Optional, Type
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 from flask import Flask, render_template
 from flask.views import MethodView
 from werkzeug.routing import parse_converter_args
@@ -23,53 +29,11 @@ OPENAPI_TEMPLATE_FOLDER = "templates"
 OPENAPI_FILENAME = "openapi.json"
 OPENAPI_UI = "swagger"
 
-
-RE_PARSE_RULE = re.compile(
-    r"""
-    (?P<static>[^<]*)                           # static rule data
-    <
-    (?:
-        (?P<converter>[a-zA-Z_][a-zA-Z0-9_]*)   # converter name
-        (?:\((?P<args>.*?)\))?                  # converter arguments
-        \:                                      # variable delimiter
-    )?
-    (?P<variable>[a-zA-Z_][a-zA-Z0-9_]*)        # variable name
-    >
-    """,
-    re.VERBOSE,
-)
-
-
-def parse_rule(rule):
-    """
-    Parse a rule and return it as generator. Each iteration yields tuples in the form
-    ``(converter, arguments, variable)``. If the converter is `None` it's a static url part, otherwise it's a dynamic
-    one.
-    Note: This originally lived in werkzeug.routing.parse_rule until it was removed in werkzeug 2.2.0.
-    """
-    pos = 0
-    end = len(rule)
-    do_match = RE_PARSE_RULE.match
-    used_names = set()
-    while pos < end:
-        m = do_match(rule, pos)
-        if m is None:
-            break
-        data = m.groupdict()
-        if data["static"]:
-            yield None, None, data["static"]
-        variable = data["variable"]
-        converter = data["converter"] or "default"
-        if variable in used_names:
-            raise ValueError(f"variable name {variable!r} used twice.")
-        used_names.add(variable)
-        yield converter, data["args"] or None, variable
-        pos = m.end()
-    if pos < end:
-        remaining = rule[pos:]
-        if ">" in remaining or "<" in remaining:
-            raise ValueError(f"malformed url rule: {rule!r}")
-        yield None, None, remaining
+_SKIP_METHODS = {"HEAD", "OPTIONS"}
+_METHOD_LC = {
+    method: method.lower()
+    for method in ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+}
 
 
 def add_openapi_spec(
@@ -79,13 +43,15 @@ def add_openapi_spec(
     mode: str = OPENAPI_MODE,
     openapi_version: str = OPENAPI_VERSION,
     openapi_info: dict = OPENAPI_INFO,
-    extra_props: dict = {},
+    extra_props: Optional[dict] = None,
 ):
     assert isinstance(app, Flask)
     assert mode in {"normal", "greedy", "strict"}
 
-    if not hasattr(add_openapi_spec, "openapi"):
-        add_openapi_spec.openapi = OpenAPI(
+    openapi = app.extensions.get("openapi")
+    if openapi is None:
+        # OpenAPI registers itself under app.extensions["openapi"]
+        openapi = OpenAPI(
             app,
             endpoint=endpoint,
             url_prefix=url_prefix,
@@ -94,8 +60,8 @@ def add_openapi_spec(
             openapi_info=openapi_info,
             extra_props=extra_props,
         )
-    openapi = add_openapi_spec.openapi
-    openapi.extra_props = extra_props
+    elif extra_props is not None:
+        openapi.extra_props = extra_props
 
     return openapi.spec
 
@@ -105,12 +71,12 @@ class APIView(MethodView):
         view_args = kwargs.pop("view_args", {})
         self.ui = view_args.get("ui")
         self.filename = view_args.get("filename")
+        assert self.ui in {"redoc", "swagger"}
+        self._ui_template = f"{self.ui}.html"
         super().__init__(*args, **kwargs)
 
     def get(self):
-        assert self.ui in {"redoc", "swagger"}
-        ui_file = f"{self.ui}.html"
-        return render_template(ui_file, spec_url=self.filename)
+        return render_template(self._ui_template, spec_url=self.filename)
 
 
 class APIError:
@@ -123,8 +89,6 @@ class APIError:
 
 
 class OpenAPI:
-    _models = {}
-
     def __init__(
         self,
         app: Flask,
@@ -133,7 +97,7 @@ class OpenAPI:
         mode: str = OPENAPI_MODE,
         openapi_version: str = OPENAPI_VERSION,
         openapi_info: dict = OPENAPI_INFO,
-        extra_props: dict = {},
+        extra_props: Optional[dict] = None,
     ) -> None:
         assert isinstance(app, Flask)
 
@@ -143,16 +107,55 @@ class OpenAPI:
         self.mode: str = mode
         self.openapi_version: str = openapi_version
         self.info: dict = openapi_info
-        self.extra_props: dict = extra_props
+        self.extra_props: Optional[dict] = extra_props
 
+        self._models = {}
         self._spec = None
+        self._spec_key = None
+        self._spec_json = None
+
+        app.extensions["openapi"] = self
 
     @property
     def spec(self):
-        if self._spec is None:
+        # regenerate only when the url map grew or `extra_props` was replaced;
+        # otherwise serving the spec is a plain dict return
+        key = (len(self.app.url_map._rules), id(self.extra_props))
+        if self._spec is None or key != self._spec_key:
             self._spec = self.generate_spec()
+            self._spec_key = key
+            self._spec_json = None
         return self._spec
 
+    @property
+    def spec_json(self) -> bytes:
+        """
+        The spec serialized to JSON bytes, cached until the spec regenerates.
+
+        Lets the docs endpoint serve the document without re-serializing it
+        on every request, e. g.
+        ``Response(openapi.spec_json, mimetype="application/json")``.
+        Uses `orjson` when installed, falling back to the stdlib.
+        """
+        spec = self.spec  # regenerating drops the cached bytes
+        if self._spec_json is None:
+            if orjson is not None:
+                self._spec_json = orjson.dumps(spec)
+            else:
+                self._spec_json = json.dumps(spec).encode()
+        return self._spec_json
+
+    def invalidate(self) -> None:
+        """
+        Drop the cached spec so it gets regenerated on the next access.
+
+        Useful when rules are registered after the spec has already been
+        served (e. g. blueprints attached at runtime).
+        """
+        self._spec = None
+        self._spec_key = None
+        self._spec_json = None
+
     def _bypass(self, func) -> bool:
         if self.mode == "greedy":
             return False
@@ -173,119 +176,69 @@ class OpenAPI:
 
         routes = {}
         tags = {}
+        models = {}
+        skip_prefixes = ((self.url_prefix or "") + self.endpoint, "/static")
 
         for rule in self.app.url_map.iter_rules():
-            if str(rule).startswith(
-                (f"{self.url_prefix or ''}{self.endpoint}", "/static")
-            ):
+            rule_str = str(rule)
+            if rule_str.startswith(skip_prefixes):
                 continue
 
-            if "resources" in str(rule):
-                pass
-
             func = self.app.view_functions[rule.endpoint]
-            path, parameters = parse_url(str(rule))
+            path, parameters = parse_url(rule_str)
 
             # bypass the function decorated by others
             if self._bypass(func):
                 continue
 
             # multiple methods (with different func) may bond to the same path
-            if path not in routes:
-                routes[path] = {}
-
-            for method in rule.methods:
-                if method in ["HEAD", "OPTIONS"]:
-                    continue
-
-                if hasattr(func, "tags"):
-                    for tag in func.tags:
-                        if tag not in tags:
-                            tags[tag] = {"name": tag}
-
-                summary, desc = get_summary_desc(func)
-                spec = {
-                    "summary": summary or func.__name__.capitalize(),
-                    "description": desc or "",
-                    "operationID": func.__name__ + "__" + method.lower(),
-                    "tags": getattr(func, "tags", []),
-                }
-
-                params = parameters[:]
-                view_class = getattr(func, "view_class", None)
-
-                if hasattr(view_class, method.lower()):
-                    view_func = getattr(view_class, method.lower())
-                    if hasattr(view_func, "body"):
-                        spec["requestBody"] = {
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": f"#/components/schemas/{view_func.body}"}
-                                }
-                            }
-                        }
-
-                    if hasattr(view_func, "form"):
-                        spec["requestBody"] = {
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": f"#/components/schemas/{view_func.form}"}
-                                }
-                            }
-                        }
-
-                    if hasattr(view_func, "query"):
-                        params.append(
-                            {
-                                "name": view_func.query,
-                                "in": "query",
-                                "required": True,
-                                "schema": {
-                                    "$ref": f"#/components/schemas/{view_func.query}",
-                                },
-                            }
-                        )
-                spec["parameters"] = params
-
-                spec["responses"] = {}
-                has_2xx = False
-                if hasattr(func, "exceptions"):
-                    for code, msg in func.exceptions.items():
-                        if code.startswith("2"):
-                            has_2xx = True
-                        spec["responses"][code] = {
-                            "description": msg,
-                        }
-
-                if hasattr(func, "response"):
-                    spec["responses"]["200"] = {
-                        "description": "Successful Response",
-                        "content": {
-                            "application/json": {
-                                "schema": {
-                                    "$ref": f"#/components/schemas/{func.response}"
-                                }
-                            }
-                        },
-                    }
-                elif not has_2xx:
-                    spec["responses"]["200"] = {"description": "Successful Response"}
-
-                if any(
-                    [hasattr(func, schema) for schema in ("query", "body", "form", "response")]
-                ):
-                    spec["responses"]["400"] = {
-                        "description": "Validation Error",
+            methods_dict = routes.setdefault(path, {})
+
+            view_class = getattr(func, "view_class", None)
+            op_ids = getattr(func, "_op_ids", None)
+
+            for method in rule.methods - _SKIP_METHODS:
+                m_lc = _METHOD_LC.get(method) or method.lower()
+                operation_id = (op_ids.get(m_lc) if op_ids else None) or (
+                    func.__name__ + "__" + m_lc
+                )
+
+                # the static portion of the spec is assembled once by
+                # `openapi_docs`; for class-based views it lives on the method
+                target = func
+                frag = getattr(target, "_openapi_spec_fragment", None)
+                if frag is None and view_class is not None:
+                    target = getattr(view_class, m_lc, None)
+                    if target is not None:
+                        frag = getattr(target, "_openapi_spec_fragment", None)
+
+                if frag is not None:
+                    models.update(target._openapi_models)
+                    # deep copy: the generated spec is handed out to callers
+                    # and deep-merged with extra_props, and neither may reach
+                    # the fragment shared by every app registering this view
+                    spec = copy.deepcopy(frag)
+                    spec["operationID"] = operation_id
+                    spec["parameters"] = parameters + spec["parameters"]
+                else:
+                    # undecorated view picked up in greedy mode
+                    summary, desc = get_summary_desc(func)
+                    spec = {
+                        "summary": summary or func.__name__.capitalize(),
+                        "description": desc or "",
+                        "operationID": operation_id,
+                        "tags": [],
+                        "parameters": parameters[:],
+                        "responses": {"200": {"description": "Successful Response"}},
                     }
 
-                routes[path][method.lower()] = spec
+                for tag in spec["tags"]:
+                    tags.setdefault(tag, {"name": tag})
 
-        definitions = {}
-        for _, schema in self._models.items():
-            if "definitions" in schema:
-                for key, value in schema["definitions"].items():
-                    definitions[key] = value
-                del schema["definitions"]
+                methods_dict[m_lc] = spec
+
+        models.update(self._models)
+        schemas, definitions = self._split_definitions(models)
 
         data = {
             "openapi": self.openapi_version,
@@ -293,18 +246,42 @@ class OpenAPI:
             "tags": list(tags.values()),
             "paths": {**routes},
             "components": {
-                "schemas": {name: schema for name, schema in self._models.items()},
+                "schemas": schemas,
             },
             "definitions": definitions,
         }
 
-        merge_dicts(data, self.extra_props)
+        if self.extra_props:
+            merge_dicts(data, self.extra_props)
 
         return data
 
-    @classmethod
-    def add_model(cls, model):
-        cls._models[model.__name__] = model.schema()
+    @staticmethod
+    def _split_definitions(models):
+        """
+        Split nested ``definitions`` out of the model schemas.
+
+        The schemas are never mutated (popping ``definitions`` in place used
+        to lose them on regeneration).
+        """
+        schemas = {}
+        definitions = {}
+        for name, schema in models.items():
+            if "definitions" in schema:
+                definitions.update(schema["definitions"])
+                schemas[name] = {
+                    key: value
+                    for key, value in schema.items()
+                    if key != "definitions"
+                }
+            else:
+                schemas[name] = schema
+        return schemas, definitions
+
+    def add_model(self, model) -> None:
+        """register an extra model's schema with this app's spec"""
+        self._models[model.__name__] = model.schema()
+        self.invalidate()
 
 
 def get_summary_desc(func):
@@ -313,14 +290,31 @@ def get_summary_desc(func):
 
     Summary and description are split by '\n\n'. If only one is provided,
     it will be used as summary.
+
+    The result is cached on the function object itself, since `inspect.getdoc`
+    walks the MRO and re-normalizes whitespace on every call.
     """
+    try:
+        cached = func.__dict__.get("_openapi_summary_desc")
+    except AttributeError:
+        cached = None
+    if cached is not None:
+        return cached
+
     doc = inspect.getdoc(func)
     if not doc:
-        return None, None
-    doc = doc.split("\n\n", 1)
-    if len(doc) == 1:
-        return doc[0], None
-    return doc
+        result = (None, None)
+    else:
+        doc = doc.split("\n\n", 1)
+        if len(doc) == 1:
+            result = (doc[0], None)
+        else:
+            result = tuple(doc)
+    try:
+        func.__dict__["_openapi_summary_desc"] = result
+    except (AttributeError, TypeError):
+        pass
+    return result
 
 
 def get_converter_schema(converter: str, *args, **kwargs):
@@ -328,6 +322,12 @@ def get_converter_schema(converter: str, *args, **kwargs):
     get json schema for parameters in url based on following converters
     https://werkzeug.palletsprojects.com/en/0.15.x/routing/#builtin-converter
     """
+    return _get_converter_schema_cached(converter, args, tuple(sorted(kwargs.items())))
+
+
+@lru_cache(maxsize=None)
+def _get_converter_schema_cached(converter: str, args: tuple, kwargs_items: tuple):
+    kwargs = dict(kwargs_items)
     if converter == "any":
         return {"type": "array", "items": {"type": "string", "enum": args}}
     elif converter == "int":
@@ -361,25 +361,90 @@ def parse_url(path: str):
     """
     Parsing Flask route url to get the normal url path and parameter type.
 
-    Based on Werkzeug_ builtin converters.
+    Based on Werkzeug_ builtin converters.  The rule tokenizer originally
+    lived in werkzeug.routing.parse_rule until it was removed in
+    werkzeug 2.2.0; it is fused into the parse below, which walks the rule
+    string once and emits the joined path and parameter list directly.
 
     .. _werkzeug: https://werkzeug.palletsprojects.com/en/0.15.x/routing/#builtin-converters
     """
+    # rule strings repeat across regenerations, so the parse is cached;
+    # copy the outer containers in case a caller mutates them
+    joined, parameters = _parse_url_cached(path)
+    return joined, [dict(parameter) for parameter in parameters]
+
+
+def _is_name(value: str) -> bool:
+    """whether `value` matches ``[a-zA-Z_][a-zA-Z0-9_]*``, the converter and
+    variable name syntax of werkzeug rules"""
+    return value.isascii() and value.isidentifier()
+
+
+@lru_cache(maxsize=4096)
+def _parse_url_cached(path: str):
     subs = []
     parameters = []
+    used_names = set()
+    pos = 0
+    end = len(path)
 
-    for converter, arguments, variable in parse_rule(path):
-        if converter is None:
-            subs.append(variable)
-            continue
-        subs.append(f"{{{variable}}}")
+    while pos < end:
+        lt = path.find("<", pos)
+        if lt == -1:
+            remaining = path[pos:]
+            if ">" in remaining:
+                raise ValueError(f"malformed url rule: {path!r}")
+            subs.append(remaining)
+            break
+        if lt > pos:
+            subs.append(path[pos:lt])
+
+        # rule segment syntax: <converter(args):variable> with the converter
+        # and argument parts optional
+        converter = None
+        arguments = None
+        gt = path.find(">", lt)
+        paren = path.find("(", lt)
+        if paren != -1 and (gt == -1 or paren < gt):
+            # quoted converter arguments may contain '>' and ')', so the
+            # segment ends at the first ')' followed by ':variable>'
+            close = paren
+            while True:
+                close = path.find(")", close + 1)
+                if close == -1:
+                    raise ValueError(f"malformed url rule: {path!r}")
+                if not path.startswith(":", close + 1):
+                    continue
+                gt = path.find(">", close + 2)
+                if gt != -1 and _is_name(path[close + 2 : gt]):
+                    break
+            converter = path[lt + 1 : paren]
+            arguments = path[paren + 1 : close]
+            variable = path[close + 2 : gt]
+        else:
+            if gt == -1:
+                raise ValueError(f"malformed url rule: {path!r}")
+            inner = path[lt + 1 : gt]
+            colon = inner.find(":")
+            if colon != -1:
+                converter = inner[:colon]
+                variable = inner[colon + 1 :]
+            else:
+                variable = inner
 
-        args, kwargs = [], {}
+        if not _is_name(variable) or (converter is not None and not _is_name(converter)):
+            raise ValueError(f"malformed url rule: {path!r}")
+        if variable in used_names:
+            raise ValueError(f"variable name {variable!r} used twice.")
+        used_names.add(variable)
 
+        subs.append("{" + variable + "}")
+
+        args, kwargs = [], {}
         if arguments:
             args, kwargs = parse_converter_args(arguments)
 
-        schema = get_converter_schema(converter, *args, **kwargs)
+        schema = get_converter_schema(converter or "default", *args, **kwargs)
 
         parameters.append(
             {
@@ -389,8 +454,12 @@ def parse_url(path: str):
                 "schema": schema,
             }
         )
+        pos = gt + 1
+
+    return "".join(subs), tuple(parameters)
 
-    return "".join(subs), parameters
+
+_MISSING = object()
 
 
 def merge_dicts(d1, d2):
@@ -403,24 +472,24 @@ def merge_dicts(d1, d2):
     For example:
     merge_dicts({"c": {"a":1}}, {"c":{"b":2}}) => {"c":{"a": 1, "b": 2}}
 
+    The merge walks an explicit stack instead of recursing, so deeply nested
+    `d2` trees pay no per-level call overhead, and `d2` is left untouched.
     """
-    for k, v in d1.items():
-        if k in d2:
-            v2 = d2.pop(k)
-            if isinstance(v, dict):
-                if isinstance(v2, dict):
-                    merge_dicts(v, v2)
-                else:
-                    d1[k] = v2
+    stack = [(d1, d2)]
+    while stack:
+        target, source = stack.pop()
+        for key, value in source.items():
+            existing = target.get(key, _MISSING)
+            if isinstance(existing, dict) and isinstance(value, dict):
+                stack.append((existing, value))
             else:
-                d1[k] = v2
-    d1.update(d2)
+                target[key] = value
     return d1
 
 def openapi_docs(
     response: Optional[Type[BaseModel]] = None,
-    exceptions: List[APIError] = [],
-    tags: List[str] = [],
+    exceptions: Optional[List[APIError]] = None,
+    tags: Optional[List[str]] = None,
 ):
     def decorate(func: Callable) -> Callable:
         @wraps(func)
@@ -428,20 +497,24 @@ def openapi_docs(
             res = func(*args, **kwargs)
             return res
 
-        query = func.__annotations__.get("query") or getattr(func, "_query", None)
-        body = func.__annotations__.get("body") or getattr(func, "_body", None)
-        form = func.__annotations__.get("form") or getattr(func, "_form", None)
+        annotations = getattr(func, "__annotations__", None) or {}
+        query = annotations.get("query") or getattr(func, "_query", None)
+        body = annotations.get("body") or getattr(func, "_body", None)
+        form = annotations.get("form") or getattr(func, "_form", None)
 
-        # register schemas to this function
+        # register schemas to this function; `generate_spec` collects them
+        # from the views it actually visits, keeping each app's spec scoped
+        models = {}
         for model, name in zip((query, body, form, response), ("query", "body", "form", "response")):
             if model:
                 assert issubclass(model, BaseModel)
-                OpenAPI.add_model(model)
+                models[model.__name__] = model.schema()
                 setattr(wrapper, name, model.__name__)
+        setattr(wrapper, "_openapi_models", models)
 
         # register exceptions
         api_errs = {}
-        for e in exceptions:
+        for e in exceptions or ():
             assert isinstance(e, APIError)
             api_errs[str(e.code)] = e.msg
         if api_errs:
@@ -451,6 +524,81 @@ def openapi_docs(
         if tags:
             setattr(wrapper, "tags", tags)
 
+        body_name, form_name, query_name = (
+            model.__name__ if model else None for model in (body, form, query)
+        )
+
+        # precompute the static portion of the operation spec so that
+        # `generate_spec` only has to merge in path parameters and methods
+        summary, desc = get_summary_desc(func)
+        frag = {
+            "summary": summary or func.__name__.capitalize(),
+            "description": desc or "",
+            "tags": tags or [],
+            "parameters": [],
+        }
+
+        request_name = form_name or body_name
+        if request_name:
+            frag["requestBody"] = {
+                "content": {
+                    "application/json": {
+                        "schema": {"$ref": f"#/components/schemas/{request_name}"}
+                    }
+                }
+            }
+
+        if query_name:
+            frag["parameters"].append(
+                {
+                    "name": query_name,
+                    "in": "query",
+                    "required": True,
+                    "schema": {
+                        "$ref": f"#/components/schemas/{query_name}",
+                    },
+                }
+            )
+
+        responses = {}
+        has_2xx = False
+        for code, msg in api_errs.items():
+            if code.startswith("2"):
+                has_2xx = True
+            responses[code] = {
+                "description": msg,
+            }
+
+        if response:
+            responses["200"] = {
+                "description": "Successful Response",
+                "content": {
+                    "application/json": {
+                        "schema": {"$ref": f"#/components/schemas/{response.__name__}"}
+                    }
+                },
+            }
+        elif not has_2xx:
+            responses["200"] = {"description": "Successful Response"}
+
+        if query or body or form or response:
+            responses["400"] = {
+                "description": "Validation Error",
+            }
+        frag["responses"] = responses
+
+        setattr(wrapper, "_openapi_spec_fragment", frag)
+
+        # operation ids are fixed at decoration; precompute them per verb
+        setattr(
+            wrapper,
+            "_op_ids",
+            {
+                m_lc: f"{func.__name__}__{m_lc}"
+                for m_lc in ("get", "post", "put", "patch", "delete")
+            },
+        )
+
         # register OpenAPI class
         setattr(wrapper, "_openapi", OpenAPI)
 
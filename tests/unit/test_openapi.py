@@ -0,0 +1,222 @@
+import pytest
+from flask import Flask
+from flask_pydantic.openapi import OpenAPI, openapi_docs, parse_url
+from pydantic import BaseModel
+
+
+class ResponseModel(BaseModel):
+    id: int
+    name: str
+
+
+class TestParseUrl:
+    def test_static_rule(self):
+        path, parameters = parse_url("/posts/")
+        assert path == "/posts/"
+        assert parameters == []
+
+    def test_default_converter(self):
+        path, parameters = parse_url("/posts/<post_id>/")
+        assert path == "/posts/{post_id}/"
+        assert parameters == [
+            {
+                "name": "post_id",
+                "in": "path",
+                "required": True,
+                "schema": {"type": "string"},
+            }
+        ]
+
+    def test_converter_with_arguments(self):
+        path, parameters = parse_url("/posts/<int(min=1):post_id>")
+        assert path == "/posts/{post_id}"
+        assert parameters == [
+            {
+                "name": "post_id",
+                "in": "path",
+                "required": True,
+                "schema": {"type": "integer", "format": "int32", "minimum": 1},
+            }
+        ]
+
+    def test_multiple_variables(self):
+        path, parameters = parse_url("/posts/<int:post_id>/<path:rest>")
+        assert path == "/posts/{post_id}/{rest}"
+        assert [parameter["name"] for parameter in parameters] == ["post_id", "rest"]
+        assert parameters[1]["schema"] == {"type": "string", "format": "path"}
+
+    def test_quoted_arguments_may_contain_angle_bracket(self):
+        path, parameters = parse_url("/x/<any('a>b', 'c'):choice>")
+        assert path == "/x/{choice}"
+        assert parameters[0]["schema"] == {
+            "type": "array",
+            "items": {"type": "string", "enum": ("a>b", "c")},
+        }
+
+    def test_quoted_arguments_may_contain_parenthesis(self):
+        path, parameters = parse_url("/x/<any('a)b'):choice>")
+        assert path == "/x/{choice}"
+        assert parameters[0]["schema"]["items"]["enum"] == ("a)b",)
+
+    @pytest.mark.parametrize(
+        "rule",
+        [
+            "/a/<foo",
+            "/a>b",
+            "/a/<b c:d>",
+            "/a/<:x>",
+            "/a/<int(min=1:x>",
+            "/a/<variablé>",
+        ],
+    )
+    def test_malformed_rule_raises(self, rule):
+        with pytest.raises(ValueError, match="malformed url rule"):
+            parse_url(rule)
+
+    def test_duplicate_variable_raises(self):
+        with pytest.raises(ValueError, match="used twice"):
+            parse_url("/a/<x>/<x>")
+
+
+class TestSpecCache:
+    def test_spec_is_reused_between_accesses(self):
+        openapi = OpenAPI(Flask("app"))
+        assert openapi.spec is openapi.spec
+
+    def test_spec_regenerates_when_a_rule_is_added(self):
+        app = Flask("app")
+        openapi = OpenAPI(app)
+        first = openapi.spec
+        assert "/posts" not in first["paths"]
+
+        app.add_url_rule("/posts", view_func=lambda: {}, endpoint="posts")
+        second = openapi.spec
+        assert second is not first
+        assert "/posts" in second["paths"]
+
+    def test_invalidate_drops_the_cached_spec(self):
+        openapi = OpenAPI(Flask("app"))
+        first = openapi.spec
+        openapi.invalidate()
+        second = openapi.spec
+        assert second is not first
+        assert second == first
+
+    def test_spec_json_is_cached_until_the_spec_regenerates(self):
+        app = Flask("app")
+        openapi = OpenAPI(app)
+        serialized = openapi.spec_json
+        assert isinstance(serialized, bytes)
+        assert openapi.spec_json is serialized
+
+        app.add_url_rule("/posts", view_func=lambda: {}, endpoint="posts")
+        assert openapi.spec_json is not serialized
+
+
+class TestSplitDefinitions:
+    def test_nested_definitions_are_lifted_without_mutation(self):
+        schema = {"title": "M", "definitions": {"Sub": {"type": "object"}}}
+        schemas, definitions = OpenAPI._split_definitions({"M": schema})
+        assert definitions == {"Sub": {"type": "object"}}
+        assert "definitions" not in schemas["M"]
+        assert schema["definitions"] == {"Sub": {"type": "object"}}
+
+    def test_definitions_survive_regeneration(self):
+        openapi = OpenAPI(Flask("app"))
+        openapi._models["M"] = {
+            "title": "M",
+            "definitions": {"Sub": {"type": "object"}},
+        }
+        first = openapi.spec["definitions"]
+        openapi.invalidate()
+        second = openapi.spec["definitions"]
+        assert first == second == {"Sub": {"type": "object"}}
+
+    def test_re_registering_a_model_updates_the_spec(self):
+        def first_version():
+            class Item(BaseModel):
+                id: int
+
+            return Item
+
+        def second_version():
+            class Item(BaseModel):
+                id: int
+                name: str
+
+            return Item
+
+        openapi = OpenAPI(Flask("app"))
+        openapi.add_model(first_version())
+        schemas = openapi.spec["components"]["schemas"]
+        assert "name" not in schemas["Item"]["properties"]
+
+        openapi.add_model(second_version())
+        schemas = openapi.spec["components"]["schemas"]
+        assert "name" in schemas["Item"]["properties"]
+
+
+class TestModelScoping:
+    def test_each_app_only_documents_its_own_models(self):
+        class FirstModel(BaseModel):
+            id: int
+
+        class SecondModel(BaseModel):
+            id: int
+
+        @openapi_docs(response=FirstModel)
+        def first_view():
+            return {}
+
+        @openapi_docs(response=SecondModel)
+        def second_view():
+            return {}
+
+        app_one = Flask("one")
+        app_one.add_url_rule("/first", view_func=first_view)
+        app_two = Flask("two")
+        app_two.add_url_rule("/second", view_func=second_view)
+
+        schemas_one = OpenAPI(app_one).spec["components"]["schemas"]
+        schemas_two = OpenAPI(app_two).spec["components"]["schemas"]
+        assert "FirstModel" in schemas_one and "SecondModel" not in schemas_one
+        assert "SecondModel" in schemas_two and "FirstModel" not in schemas_two
+
+    def test_add_model_registers_with_one_app_only(self):
+        class ExtraModel(BaseModel):
+            id: int
+
+        openapi = OpenAPI(Flask("one"))
+        other = OpenAPI(Flask("two"))
+        openapi.add_model(ExtraModel)
+
+        assert "ExtraModel" in openapi.spec["components"]["schemas"]
+        assert "ExtraModel" not in other.spec["components"]["schemas"]
+
+
+class TestSpecFragmentIsolation:
+    def test_extra_props_merge_does_not_leak_into_other_apps(self):
+        @openapi_docs(response=ResponseModel)
+        def get_post():
+            """Get a post."""
+            return {}
+
+        extra_props = {
+            "paths": {
+                "/posts": {"get": {"responses": {"500": {"description": "boom"}}}}
+            }
+        }
+
+        app_one = Flask("one")
+        app_one.add_url_rule("/posts", view_func=get_post)
+        app_two = Flask("two")
+        app_two.add_url_rule("/posts", view_func=get_post)
+
+        spec_one = OpenAPI(app_one, extra_props=extra_props).spec
+        assert "500" in spec_one["paths"]["/posts"]["get"]["responses"]
+
+        # the merge must stay local to app one; the decoration-time fragment
+        # shared by both apps (and future regenerations) must stay clean
+        spec_two = OpenAPI(app_two).spec
+        assert "500" not in spec_two["paths"]["/posts"]["get"]["responses"]
+        assert "500" not in get_post._openapi_spec_fragment["responses"]